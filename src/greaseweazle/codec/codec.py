@@ -5,7 +5,7 @@
 # This is free and unencumbered software released into the public domain.
 # See the file COPYING for more details, or visit <http://unlicense.org>.
 
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, List, Tuple, Optional
 
 import os.path, re
 import importlib.resources
@@ -18,6 +18,18 @@ from greaseweazle.tools import util
 from greaseweazle.track import MasterTrack, PLL
 from greaseweazle.flux import Flux, HasFlux, WriteoutFlux
 
+# Diskdef file syntax, compiled once at import time.
+_RE_COMMENT = re.compile(r'\s*([^#]*)')
+_RE_DISK = re.compile(r'disk\s+([\w,.-]+)')
+_RE_END = re.compile(r'end$')
+_RE_DISK_LEADING = re.compile(r'\s*disk\s+([\w,.-]+)')
+_RE_TRACKS = re.compile(r'tracks\s+([0-9,.*-]+)\s+([\w,.-]+)')
+_RE_TSPEC = re.compile(r'(\d+)(?:-(\d+))?(?:\.([01]))?')
+_RE_KV_DISK = re.compile(r'([a-zA-Z0-9:,._-]+)\s*='
+                         r'\s*([a-zA-Z0-9:,._-]+)')
+_RE_KV_TRACK = re.compile(r'([a-zA-Z0-9:,._-]+)\s*='
+                          r'\s*([a-zA-Z0-9:,._*-]+)')
+
 
 class Codec:
 
@@ -136,14 +148,29 @@ class DiskDef:
 
 
 
+# Lines of each diskdef file read so far, keyed by path. User files are
+# re-read if their modification time changes.
+diskdef_file_cache: Dict[Optional[str], Tuple[Optional[float], List[str]]]
+diskdef_file_cache = dict()
+
 def read_diskdef_file_lines(filename: Optional[str]) -> Tuple[List[str], str]:
-    if filename is None:
-        filename = 'diskdefs.cfg'
-        with importlib.resources.open_text('greaseweazle.data', filename) as f:
+    path, mtime = None, None
+    if filename is not None:
+        path = os.path.expanduser(filename)
+        mtime = os.path.getmtime(path)
+    cached = diskdef_file_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        lines = cached[1]
+    elif path is None:
+        with importlib.resources.open_text('greaseweazle.data',
+                                           'diskdefs.cfg') as f:
             lines = f.readlines()
     else:
-        with open(os.path.expanduser(filename), 'r') as f:
+        with open(path, 'r') as f:
             lines = f.readlines()
+    diskdef_file_cache[path] = (mtime, lines)
+    if filename is None:
+        filename = 'diskdefs.cfg'
     return (lines, filename)
 
 
@@ -175,21 +202,164 @@ class ParseMode:
     Disk  = 1
     Track = 2
 
+class DiskdefParser:
+
+    def __init__(self) -> None:
+        self.mode = ParseMode.Outer
+        self.disk: Optional[DiskDef] = None
+        self.track: Optional[TrackDef] = None
+
+    def disk_start(self, m: re.Match) -> int:
+        self.disk = DiskDef()
+        return ParseMode.Disk
+
+    def disk_end(self, m: re.Match) -> int:
+        return ParseMode.Outer
+
+    def disk_param(self, m: re.Match) -> int:
+        assert self.disk is not None # mypy
+        self.disk.add_param(m.group(1), m.group(2))
+        return ParseMode.Disk
+
+    def tracks_start(self, m: re.Match) -> int:
+        disk = self.disk
+        assert disk is not None # mypy
+        error.check(disk.cyls is not None, 'missing cyls')
+        error.check(disk.heads is not None, 'missing heads')
+        assert disk.cyls is not None # mypy
+        assert disk.heads is not None # mypy
+        self.track = track = mk_trackdef(m.group(2))
+        for x in m.group(1).split(','):
+            if x == '*':
+                for c in range(disk.cyls):
+                    for hd in range(disk.heads):
+                        if (c,hd) not in disk.track_map:
+                            disk.track_map[c,hd] = track
+            else:
+                t_match = _RE_TSPEC.match(x)
+                error.check(t_match is not None, 'bad track specifier')
+                assert t_match is not None # mypy
+                s = int(t_match.group(1))
+                e = t_match.group(2)
+                e = s if e is None else int(e)
+                h = t_match.group(3)
+                if h is None:
+                    h = list(range(disk.heads))
+                else:
+                    error.check(int(h) < disk.heads, 'head out of range')
+                    h = [int(h)]
+                error.check(0 <= s < disk.cyls and 0 <= e < disk.cyls
+                            and s <= e, 'cylinder out of range')
+                for c in range(s,e+1):
+                    for hd in h:
+                        disk.track_map[c,hd] = track
+        return ParseMode.Track
+
+    def tracks_end(self, m: re.Match) -> int:
+        if self.track is not None:
+            self.track.finalise()
+            self.track = None
+        return ParseMode.Disk
+
+    def track_param(self, m: re.Match) -> int:
+        assert self.track is not None # mypy
+        self.track.add_param(m.group(1), m.group(2))
+        return ParseMode.Track
+
+# Per-mode parse rules, tried in order. A line matching none of the rules
+# for the current mode is a syntax error.
+ParseRule = Tuple[re.Pattern, Callable[[DiskdefParser, re.Match], int]]
+_OUTER_RULES: List[ParseRule] = [
+    (_RE_DISK, DiskdefParser.disk_start) ]
+_DISK_RULES: List[ParseRule] = [
+    (_RE_END, DiskdefParser.disk_end),
+    (_RE_TRACKS, DiskdefParser.tracks_start),
+    (_RE_KV_DISK, DiskdefParser.disk_param) ]
+_TRACK_RULES: List[ParseRule] = [
+    (_RE_END, DiskdefParser.tracks_end),
+    (_RE_KV_TRACK, DiskdefParser.track_param) ]
+_PARSE_RULES = { ParseMode.Outer: _OUTER_RULES,
+                 ParseMode.Disk: _DISK_RULES,
+                 ParseMode.Track: _TRACK_RULES }
+
+# Parsed diskdefs, keyed by diskdef filename and format name. Each entry
+# holds the file lines it was parsed from, so that a changed file is noticed.
+diskdef_cache: Dict[Tuple[Optional[str], str],
+                    Tuple[List[str], Optional[DiskDef]]] = dict()
+
 def get_diskdef(
         format_name: str,
         diskdef_filename: Optional[str] = None
 ) -> Optional[DiskDef]:
 
-    parse_mode = ParseMode.Outer
-    active = False
-    disk: Optional[DiskDef] = None
-    track: Optional[TrackDef] = None
-    lines, diskdef_filename = read_diskdef_file_lines(diskdef_filename)
+    lines, filename = read_diskdef_file_lines(diskdef_filename)
+    key = (diskdef_filename, format_name)
+    cached = diskdef_cache.get(key)
+    if cached is None or cached[0] is not lines:
+        cached = (lines, parse_diskdef(format_name, lines, filename))
+        diskdef_cache[key] = cached
+    disk = cached[1]
+    return None if disk is None else copy(disk)
+
+# Line range of each disk block, keyed by diskdef filename. Each entry
+# holds the file lines it was built from, so that a changed file is noticed.
+diskdef_index_cache: Dict[Optional[str],
+                          Tuple[List[str], Dict[str, Tuple[int,int]]]] = dict()
+
+def index_diskdef_file(
+        lines: List[str],
+        diskdef_filename: str
+) -> Dict[str, Tuple[int,int]]:
+
+    index: Dict[str, Tuple[int,int]] = dict()
+    depth, name, start = 0, '', 0
 
     for linenr, l in enumerate(lines, start=1):
+        match = _RE_COMMENT.match(l)
+        assert match is not None # mypy
+        t = match.group(1).strip()
+        if not t:
+            continue
+        if depth == 0:
+            disk_match = _RE_DISK.match(t)
+            if disk_match is None:
+                raise error.Fatal('%s, line %d: syntax error'
+                                  % (diskdef_filename, linenr))
+            depth, name, start = 1, disk_match.group(1), linenr-1
+        elif t == 'end':
+            depth -= 1
+            if depth == 0:
+                index[name] = (start, linenr)
+        elif depth == 1 and _RE_TRACKS.match(t):
+            depth = 2
+
+    # An unterminated disk block runs to the end of the file.
+    if depth != 0:
+        index[name] = (start, len(lines))
+
+    return index
+
+def parse_diskdef(
+        format_name: str,
+        lines: List[str],
+        diskdef_filename: str
+) -> Optional[DiskDef]:
+
+    # Find the line range of the requested disk. Only that range is parsed.
+    cached_index = diskdef_index_cache.get(diskdef_filename)
+    if cached_index is None or cached_index[0] is not lines:
+        cached_index = (lines, index_diskdef_file(lines, diskdef_filename))
+        diskdef_index_cache[diskdef_filename] = cached_index
+    if format_name not in cached_index[1]:
+        return None
+    first, last = cached_index[1][format_name]
+
+    parser = DiskdefParser()
+
+    for linenr, l in enumerate(lines[first:last], start=first+1):
         try:
             # Strip comments and whitespace.
-            match = re.match(r'\s*([^#]*)', l)
+            match = _RE_COMMENT.match(l)
             assert match is not None # mypy
             t = match.group(1).strip()
 
@@ -197,98 +367,20 @@ def get_diskdef(
             if not t:
                 continue
 
-            if parse_mode == ParseMode.Outer:
-                disk_match = re.match(r'disk\s+([\w,.-]+)', t)
-                error.check(disk_match is not None, 'syntax error')
-                assert disk_match is not None # mypy
-                parse_mode = ParseMode.Disk
-                active = disk_match.group(1) == format_name
-                if active:
-                    disk = DiskDef()
-
-            elif parse_mode == ParseMode.Disk:
-                if t == 'end':
-                    parse_mode = ParseMode.Outer
-                    active = False
-                    continue
-                tracks_match = re.match(r'tracks\s+([0-9,.*-]+)'
-                                        '\s+([\w,.-]+)', t)
-                if tracks_match:
-                    parse_mode = ParseMode.Track
-                    if not active:
-                        continue
-                    assert disk is not None # mypy
-                    error.check(disk.cyls is not None, 'missing cyls')
-                    error.check(disk.heads is not None, 'missing heads')
-                    assert disk.cyls is not None # mypy
-                    assert disk.heads is not None # mypy
-                    track = mk_trackdef(tracks_match.group(2))
-                    for x in tracks_match.group(1).split(','):
-                        if x == '*':
-                            for c in range(disk.cyls):
-                                for hd in range(disk.heads):
-                                    if (c,hd) not in disk.track_map:
-                                        disk.track_map[c,hd] = track
-                        else:
-                            t_match = re.match(r'(\d+)(?:-(\d+))?'
-                                               '(?:\.([01]))?', x)
-                            error.check(t_match is not None,
-                                        'bad track specifier')
-                            assert t_match is not None # mypy
-                            s = int(t_match.group(1))
-                            e = t_match.group(2)
-                            e = s if e is None else int(e)
-                            h = t_match.group(3)
-                            if h is None:
-                                h = list(range(disk.heads))
-                            else:
-                                error.check(int(h) < disk.heads,
-                                            'head out of range')
-                                h = [int(h)]
-                            error.check(0 <= s < disk.cyls
-                                        and 0 <= e < disk.cyls
-                                        and s <= e,
-                                        'cylinder out of range')
-                            for c in range(s,e+1):
-                                for hd in h:
-                                    disk.track_map[c,hd] = track
-                    continue
-
-                if not active:
-                    continue
-                assert disk is not None # mypy
-
-                keyval_match = re.match(r'([a-zA-Z0-9:,._-]+)\s*='
-                                        '\s*([a-zA-Z0-9:,._-]+)', t)
-                error.check(keyval_match is not None, 'syntax error')
-                assert keyval_match is not None # mypy
-                disk.add_param(keyval_match.group(1),
-                               keyval_match.group(2))
-
-            elif parse_mode == ParseMode.Track:
-                if t == 'end':
-                    parse_mode = ParseMode.Disk
-                    if track is not None:
-                        track.finalise()
-                        track = None
-                    continue
-
-                if not active:
-                    continue
-                assert track is not None # mypy
-
-                keyval_match = re.match(r'([a-zA-Z0-9:,._-]+)\s*='
-                                        '\s*([a-zA-Z0-9:,._*-]+)', t)
-                error.check(keyval_match is not None, 'syntax error')
-                assert keyval_match is not None # mypy
-                track.add_param(keyval_match.group(1),
-                                keyval_match.group(2))
+            for pat, fn in _PARSE_RULES[parser.mode]:
+                m = pat.match(t)
+                if m:
+                    parser.mode = fn(parser, m)
+                    break
+            else:
+                raise error.Fatal('syntax error')
 
         except Exception as err:
             ctxt = "%s, line %d: " % (diskdef_filename, linenr)
             err.args = (ctxt + err.args[0],) + err.args[1:]
             raise
 
+    disk = parser.disk
     if disk is None:
         return None
     disk.finalise()
@@ -300,7 +392,7 @@ def print_formats(diskdef_filename: Optional[str] = None) -> str:
     columns, sep, formats = 80, 2, []
     lines, _ = read_diskdef_file_lines(diskdef_filename)
     for l in lines:
-        disk_match = re.match(r'\s*disk\s+([\w,.-]+)', l)
+        disk_match = _RE_DISK_LEADING.match(l)
         if disk_match:
             formats.append(disk_match.group(1))
     formats.sort()
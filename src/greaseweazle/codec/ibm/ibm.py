@@ -9,19 +9,22 @@ from __future__ import annotations
 from typing import Any, List, Optional, Union, Tuple
 
 import re
-import copy, heapq, struct, functools
+import bisect, heapq, math, struct
 import itertools as it
+from binascii import crc_hqx
 from bitarray import bitarray
 from enum import Enum
-import crcmod.predefined
 
 from greaseweazle import error
+from greaseweazle import optimised
 from greaseweazle.codec import codec
 from greaseweazle.track import MasterTrack, PLL, PLLTrack
 from greaseweazle.flux import Flux, HasFlux
 
 default_revs = 2
 
+_RE_BPS = re.compile(r'(\d+)\*(\d+)')
+
 def sync(dat, clk=0xc7):
     x = 0
     for i in range(8):
@@ -31,6 +34,9 @@ def sync(dat, clk=0xc7):
         x |= (dat >> (7-i)) & 1
     return bytes(struct.pack('>H', x))
 
+# FM mark bytes with the standard missing-clock pattern, indexed by mark.
+fm_mark_sync = tuple(sync(x) for x in range(256))
+
 fm_sync_prefix = bitarray(endian='big')
 fm_sync_prefix.frombytes(b'\xaa\xaa' + sync(0xf8))
 fm_sync_prefix = fm_sync_prefix[:16+10]
@@ -47,6 +53,26 @@ mfm_sync_bytes = b'\x44\x89' * 3
 mfm_sync = bitarray(endian='big')
 mfm_sync.frombytes(mfm_sync_bytes)
 
+def bitsearch(bits: bitarray, pattern: bitarray) -> List[int]:
+    """Fast equivalent of list(bits.itersearch(pattern))."""
+    # Search each of the eight bit alignments of the bitstream for the
+    # whole-byte prefix of the pattern, then check each candidate in full.
+    nbytes = len(pattern) // 8
+    if nbytes == 0:
+        return list(bits.itersearch(pattern))
+    prefix = pattern[:nbytes*8].tobytes()
+    hits = []
+    for shift in range(8):
+        buf = bits[shift:].tobytes()
+        i = buf.find(prefix)
+        while i >= 0:
+            offs = shift + i*8
+            if bits[offs:offs+len(pattern)] == pattern:
+                hits.append(offs)
+            i = buf.find(prefix, i+1)
+    hits.sort()
+    return hits
+
 def fm_encode(dat):
     out = bytearray()
     for x in dat:
@@ -74,10 +100,14 @@ for x in range(256):
         y |= (x >> (7-i)) & 1
     encode_list.append(y)
 
+# High and low bytes of each encoded byte, as bytes.translate() tables.
+encode_hi = bytes([y >> 8 for y in encode_list])
+encode_lo = bytes([y & 255 for y in encode_list])
+
 def encode(dat):
-    out = bytearray()
-    for x in dat:
-        out += struct.pack('>H', encode_list[x])
+    out = bytearray(len(dat)*2)
+    out[0::2] = dat.translate(encode_hi)
+    out[1::2] = dat.translate(encode_lo)
     return bytes(out)
 doubler = encode
 
@@ -95,7 +125,25 @@ def decode(dat):
         out.append(decode_list[((x<<8)|y)&0x5555])
     return bytes(out)
 
-crc16 = crcmod.predefined.Crc('crc-ccitt-false')
+class DecodedBits:
+    """Data bits of a raw bitstream, split once by bitcell parity."""
+    def __init__(self, bits: bitarray):
+        if optimised.enabled:
+            even, odd = bitarray(endian='big'), bitarray(endian='big')
+            e, o = optimised.split_bitcells(bits.tobytes())
+            even.frombytes(e)
+            odd.frombytes(o)
+            del even[(len(bits)+1)//2:]
+            del odd[len(bits)//2:]
+            self.phase = (even, odd)
+        else:
+            self.phase = (bits[0::2], bits[1::2])
+    def decode(self, s: int, e: int) -> bytes:
+        """Equivalent to decode(bits[s:e].tobytes())."""
+        n, s = (e-s)//2, s+1
+        p = self.phase[s&1]
+        s >>= 1
+        return p[s:s+n].tobytes()
 
 def sec_sz(n):
     return 128 << n if n <= 7 else 128 << 8
@@ -168,9 +216,10 @@ class IDAM(TrackArea):
         return (super().__eq__(x)
                 and self.c == x.c and self.h == x.h
                 and self.r == x.r and self.n == x.n)
-    def __copy__(self):
+    def clone(self):
         return IDAM(self.start, self.end, self.crc,
                     self.c, self.h, self.r, self.n)
+    __copy__ = clone
 
 class DAM(TrackArea):
     def __init__(self, start, end, crc, mark, data=None):
@@ -183,8 +232,9 @@ class DAM(TrackArea):
         return (super().__eq__(x)
                 and self.mark == x.mark
                 and self.data == x.data)
-    def __copy__(self):
+    def clone(self):
         return DAM(self.start, self.end, self.crc, self.mark, self.data)
+    __copy__ = clone
 
 class Sector(TrackArea):
     def __init__(self, idam, dam):
@@ -204,12 +254,24 @@ class Sector(TrackArea):
         return (super().__eq__(x)
                 and self.idam == x.idam
                 and self.dam == x.dam)
-    
+    def digest(self) -> bytes:
+        # Everything __eq__ requires to match exactly, i.e. all but position.
+        idam, dam = self.idam, self.dam
+        return struct.pack('>3H5BI', self.crc, idam.crc, dam.crc,
+                           idam.c, idam.h, idam.r, idam.n,
+                           dam.mark, len(dam.data)) + dam.data
+    def near(self, x):
+        # The position checks of __eq__.
+        return all(abs(a.start - b.start) < 1000 and abs(a.end - b.end) < 1000
+                   for a, b in ((self, x), (self.idam, x.idam),
+                                (self.dam, x.dam)))
+
 class IAM(TrackArea):
     def __str__(self):
         return "IAM: %6d-%6d" % (self.start, self.end)
-    def __copy__(self):
+    def clone(self):
         return IAM(self.start, self.end)
+    __copy__ = clone
 
 
 class DEC_MMFM:
@@ -275,7 +337,7 @@ class IBMTrack(codec.Codec):
         return self.sectors[sec_id].crc == 0
 
     def nr_missing(self) -> int:
-        return len(list(filter(lambda x: x.crc != 0, self.sectors)))
+        return sum(1 for x in self.sectors if x.crc != 0)
 
     def set_img_track(self, tdat: bytes) -> int:
         pos = 0
@@ -283,8 +345,7 @@ class IBMTrack(codec.Codec):
         if self.img_bps is not None:
             totsize = len(self.sectors) * self.img_bps
         else:
-            totsize = functools.reduce(lambda x, y: x + len(y.dam.data),
-                                       self.sectors, 0)
+            totsize = sum(len(s.dam.data) for s in self.sectors)
         if len(tdat) < totsize:
             tdat += bytes(totsize - len(tdat))
         for s in self.sectors:
@@ -312,27 +373,38 @@ class IBMTrack(codec.Codec):
         readback_track = self.__class__(self.cyl, self.head, self.mode)
         readback_track.clock = self.clock
         readback_track.time_per_rev = self.time_per_rev
-        for iam in self.iams:
-            readback_track.iams.append(copy.copy(iam))
+        readback_track.iams = [iam.clone() for iam in self.iams]
         for sec in self.sectors:
-            idam, dam = copy.copy(sec.idam), copy.copy(sec.dam)
+            idam, dam = sec.idam.clone(), sec.dam.clone()
             idam.crc, dam.crc = 0xffff, 0xffff
             readback_track.sectors.append(Sector(idam, dam))
         readback_track.decode_flux(flux)
         if readback_track.nr_missing() != 0:
             return False
-        return self.sectors == readback_track.sectors
+        # Equivalent to comparing the sector lists with ==, but all exact
+        # fields are compared at once as a single bytes object.
+        written, readback = self.sectors, readback_track.sectors
+        if len(written) != len(readback):
+            return False
+        if (b''.join([s.digest() for s in written])
+            != b''.join([s.digest() for s in readback])):
+            return False
+        return all(s.near(r) for s, r in zip(written, readback))
 
     def mfm_master_track(self) -> bytes:
 
         areas = heapq.merge(self.iams, self.sectors, key=lambda x:x.start)
-        t = bytes()
+        t = bytearray()
+
+        # Gaps are runs of a single byte value: encode it just once.
+        gap_unit = encode(bytes([self.gapbyte]))
+        presync = encode(bytes(self.gap_presync))
 
         for a in areas:
             start = a.start//16 - self.gap_presync
             gap = max(start - len(t)//2, 0)
-            t += encode(bytes([self.gapbyte] * gap))
-            t += encode(bytes(self.gap_presync))
+            t += gap_unit * gap
+            t += presync
             if isinstance(a, IAM):
                 t += mfm_iam_sync_bytes
                 t += encode(bytes([Mark.IAM]))
@@ -340,51 +412,55 @@ class IBMTrack(codec.Codec):
                 t += mfm_sync_bytes
                 idam = bytes([0xa1, 0xa1, 0xa1, Mark.IDAM,
                               a.idam.c, a.idam.h, a.idam.r, a.idam.n])
-                idam += struct.pack('>H', crc16.new(idam).crcValue)
+                idam += struct.pack('>H', crc_hqx(idam, 0xffff))
                 t += encode(idam[3:])
                 start = a.dam.start//16 - self.gap_presync
                 gap = max(start - len(t)//2, 0)
-                t += encode(bytes([self.gapbyte] * gap))
-                t += encode(bytes(self.gap_presync))
+                t += gap_unit * gap
+                t += presync
                 t += mfm_sync_bytes
                 dam = bytes([0xa1, 0xa1, 0xa1, a.dam.mark]) + a.dam.data
-                dam += struct.pack('>H', crc16.new(dam).crcValue)
+                dam += struct.pack('>H', crc_hqx(dam, 0xffff))
                 t += encode(dam[3:])
 
-        return t
+        return bytes(t)
 
     def fm_master_track(self, mmfm_areas=None) -> bytes:
 
         areas = heapq.merge(self.iams, self.sectors, key=lambda x:x.start)
-        t = bytes()
+        t = bytearray()
+
+        # Gaps are runs of a single byte value: encode it just once.
+        gap_unit = encode(bytes([self.gapbyte]))
+        presync = encode(bytes(self.gap_presync))
 
         for a in areas:
             start = a.start//16 - self.gap_presync
             gap = max(start - len(t)//2, 0)
-            t += encode(bytes([self.gapbyte] * gap))
-            t += encode(bytes(self.gap_presync))
+            t += gap_unit * gap
+            t += presync
             if isinstance(a, IAM):
                 t += fm_iam_sync_bytes
             elif isinstance(a, Sector):
                 idam = bytes([Mark.IDAM,
                               a.idam.c, a.idam.h, a.idam.r, a.idam.n])
-                idam += struct.pack('>H', crc16.new(idam).crcValue)
-                t += sync(idam[0]) + encode(idam[1:])
+                idam += struct.pack('>H', crc_hqx(idam, 0xffff))
+                t += fm_mark_sync[idam[0]] + encode(idam[1:])
                 start = a.dam.start//16 - self.gap_presync
                 gap = max(start - len(t)//2, 0)
-                t += encode(bytes([self.gapbyte] * gap))
-                t += encode(bytes(self.gap_presync))
+                t += gap_unit * gap
+                t += presync
                 dam = bytes([a.dam.mark]) + a.dam.data
-                dam += struct.pack('>H', crc16.new(dam).crcValue)
-                t += sync(dam[0])
+                dam += struct.pack('>H', crc_hqx(dam, 0xffff))
+                t += fm_mark_sync[dam[0]]
                 if ((dam[0] & 0xfb) == Mark.DDAM_DEC_MMFM
                     and mmfm_areas is not None):
                     mmfm_areas.append((dec_mmfm.encode(dam[1:]), len(t)))
-                    t += encode(bytes([self.gapbyte] * (128+2)))
+                    t += gap_unit * (128+2)
                 else:
                     t += encode(dam[1:])
 
-        return t
+        return bytes(t)
 
     def master_track(self) -> MasterTrack:
 
@@ -401,7 +477,7 @@ class IBMTrack(codec.Codec):
         # Add the pre-index gap.
         tlen = int((self.time_per_rev / self.clock) // 16)
         gap = max(tlen - len(t)//2, 0)
-        t += encode(bytes([self.gapbyte] * gap))
+        t += encode(bytes([self.gapbyte])) * gap
 
         if self.mode is Mode.FM:
             t = fm_encode(t)
@@ -430,44 +506,48 @@ class IBMTrack(codec.Codec):
     def mfm_decode_raw(raw: PLLTrack) -> List[TrackArea]:
 
         bits, _ = raw.get_all_data()
+        dec = DecodedBits(bits)
         areas: List[TrackArea] = []
         idam = None
 
         ## 1. Calculate offsets within dump
         
-        for offs in bits.itersearch(mfm_iam_sync):
+        for offs in bitsearch(bits, mfm_iam_sync):
             if len(bits) < offs+4*16:
                 continue
-            mark = decode(bits[offs+3*16:offs+4*16].tobytes())[0]
+            mark = dec.decode(offs+3*16, offs+4*16)[0]
             if mark == Mark.IAM:
                 areas.append(IAM(offs, offs+4*16))
 
-        for offs in bits.itersearch(mfm_sync):
-
+        marks: List[Tuple[int,int]] = []
+        for offs in bitsearch(bits, mfm_sync):
             if len(bits) < offs+4*16:
                 continue
-            mark = decode(bits[offs+3*16:offs+4*16].tobytes())[0]
+            marks.append((offs, dec.decode(offs+3*16, offs+4*16)[0]))
+
+        ## 2. Pair each DAM with the IDAM immediately preceding it
+
+        for offs, mark in marks:
             if mark == Mark.IDAM:
                 s, e = offs, offs+10*16
                 if len(bits) < e:
                     continue
-                b = decode(bits[s:e].tobytes())
+                b = dec.decode(s, e)
                 c,h,r,n = struct.unpack(">4x4B2x", b)
-                crc = crc16.new(b).crcValue
+                crc = crc_hqx(b, 0xffff)
                 if idam is not None:
                     areas.append(idam)
                 idam = IDAM(s, e, crc, c=c, h=h, r=r, n=n)
             elif mark == Mark.DAM or mark == Mark.DDAM:
-                if idam is None or offs - idam.end > 1000:
-                    areas.append(DAM(offs, offs+4*16, 0xffff, mark=mark))
-                else:
+                # A DAM without a recent IDAM is of no use: skip it.
+                if idam is not None and offs - idam.end <= 1000:
                     sz = 128 << idam.n
                     s, e = offs, offs+(4+sz+2)*16
                     if len(bits) < e:
                         continue
-                    b = decode(bits[s:e].tobytes())
-                    crc = crc16.new(b).crcValue
-                    dam = DAM(s, e, crc, mark=mark, data=b[4:-2])
+                    b = dec.decode(s, e)
+                    crc = crc_hqx(b, 0xffff)
+                    dam = DAM(s, e, crc, mark=mark, data=memoryview(b)[4:-2])
                     areas.append(Sector(idam, dam))
                 idam = None
             else:
@@ -497,23 +577,26 @@ class IBMTrack(codec.Codec):
                       mmfm_raw: Optional[PLLTrack] = None) -> List[TrackArea]:
 
         bits, times = raw.get_all_data()
+        dec = DecodedBits(bits)
         areas: List[TrackArea] = []
         idam = None
 
+        mmfm_offs: Optional[int] = None
         if mmfm_raw is not None:
             mmfm_bits, mmfm_times = mmfm_raw.get_all_data()
-            mmfm_iter = mmfm_bits.itersearch(dec_mmfm.sync_prefix)
+            mmfm_iter = iter(bitsearch(mmfm_bits, dec_mmfm.sync_prefix))
             mmfm_offs = next(mmfm_iter, None)
             fm_time, prev_fm_offs = 0.0, 0
             mmfm_time, prev_mmfm_offs = 0.0, 0
 
         ## 1. Calculate offsets within dump
         
-        for offs in bits.itersearch(fm_iam_sync):
+        for offs in bitsearch(bits, fm_iam_sync):
             offs += 16
             areas.append(IAM(offs, offs+1*16))
 
-        for offs in bits.itersearch(fm_sync_prefix):
+        marks: List[Tuple[int,int,Optional[int]]] = []
+        for offs in bitsearch(bits, fm_sync_prefix):
 
             # DEC MMFM track: Ensure this looks like an FM mark even at
             # double rate. This also finds the equivalent point in the
@@ -535,17 +618,22 @@ class IBMTrack(codec.Codec):
             offs += 16
             if len(bits) < offs+1*16:
                 continue
-            mark = decode(bits[offs:offs+1*16].tobytes())[0]
-            clock = decode(bits[offs-1:offs+1*16-1].tobytes())[0]
+            mark = dec.decode(offs, offs+1*16)[0]
+            clock = dec.decode(offs-1, offs+1*16-1)[0]
             if clock != 0xc7:
                 continue
+            marks.append((offs, mark, mmfm_offs))
+
+        ## 2. Pair each DAM with the IDAM immediately preceding it
+
+        for offs, mark, mmfm_offs in marks:
             if mark == Mark.IDAM:
                 s, e = offs, offs+7*16
                 if len(bits) < e:
                     continue
-                b = decode(bits[s:e].tobytes())
+                b = dec.decode(s, e)
                 c,h,r,n = struct.unpack(">x4B2x", b)
-                crc = crc16.new(b).crcValue
+                crc = crc_hqx(b, 0xffff)
                 if idam is not None:
                     areas.append(idam)
                 idam = IDAM(s, e, crc, c=c, h=h, r=r, n=n)
@@ -553,23 +641,23 @@ class IBMTrack(codec.Codec):
                   or mark == Mark.DAM_TRS80_DIR
                   or ((mark & 0xfb) == Mark.DDAM_DEC_MMFM
                       and mmfm_raw is not None)):
+                # A DAM without a recent IDAM is of no use: skip it.
                 if idam is None or offs - idam.end > 1000:
-                    areas.append(DAM(offs, offs+4*16, 0xffff, mark=mark))
                     continue
                 sz = 128 << idam.n
                 s, e = offs, offs+(1+sz+2)*16
                 if (mark & 0xfb) != Mark.DDAM_DEC_MMFM:
                     if len(bits) < e:
                         continue
-                    b = decode(bits[s:e].tobytes())
+                    b = dec.decode(s, e)
                 else:
                     assert mmfm_offs is not None
                     ds, de = mmfm_offs+64+1, mmfm_offs+64+1+(sz*2+2)*16
                     if len(mmfm_bits) < de:
                         continue
                     b = bytes([mark]) + dec_mmfm.decode(mmfm_bits[ds:de])
-                crc = crc16.new(b).crcValue
-                dam = DAM(s, e, crc, mark=mark, data=b[1:-2])
+                crc = crc_hqx(b, 0xffff)
+                dam = DAM(s, e, crc, mark=mark, data=memoryview(b)[1:-2])
                 areas.append(Sector(idam, dam))
                 idam = None
             else:
@@ -613,26 +701,31 @@ class IBMTrack(codec.Codec):
                                 clock = self.clock/2, data = flux, pll = pll)
             areas = self.fm_decode_raw(raw, mmfm_raw)
 
-        # Add to the deduped lists
-        a: Optional[TrackArea]
+        # Add to the deduped lists. These are kept sorted by start offset,
+        # so that duplicates can be found by binary search.
+        self.iams.sort(key=lambda x:x.start)
+        self.sectors.sort(key=lambda x:x.start)
+        iam_starts = [x.start for x in self.iams]
+        sec_starts = [x.start for x in self.sectors]
+
+        def add(list: List[Any], starts: List[int], a: TrackArea) -> None:
+            i = bisect.bisect_right(starts, a.start - 1000)
+            if i < len(starts) and starts[i] < a.start + 1000:
+                s = list[i]
+                if isinstance(a, Sector) and s.crc != 0 and a.crc == 0:
+                    del list[i], starts[i]
+                    i = bisect.bisect_left(starts, a.start)
+                    list.insert(i, a)
+                    starts.insert(i, a.start)
+                return
+            list.insert(i, a)
+            starts.insert(i, a.start)
+
         for a in areas:
-            list: List[Any]
             if isinstance(a, IAM):
-                list = self.iams
+                add(self.iams, iam_starts, a)
             elif isinstance(a, Sector):
-                list = self.sectors
-            else:
-                continue
-            for i, s in enumerate(list):
-                if abs(s.start - a.start) < 1000:
-                    if isinstance(a, Sector) and s.crc != 0 and a.crc == 0:
-                        self.sectors[i] = a
-                    a = None
-                    break
-            if a is not None:
-                list.append(a)
-        self.iams.sort(key=lambda x:x.start)
-        self.sectors.sort(key=lambda x:x.start)
+                add(self.sectors, sec_starts, a)
 
 
 class IBMTrack_Fixed(IBMTrack):
@@ -668,9 +761,16 @@ class IBMTrack_Fixed(IBMTrack):
             print('T%d.%d: Ignoring unexpected sector C:%d H:%d R:%d N:%d'
                   % (self.cyl, self.head, *m))
 
-    @classmethod
-    def from_config(cls, config: IBMTrack_FixedDef, cyl: int, head: int,
-                    warn_on_oversize = True):
+    @staticmethod
+    def prepare_layout(config: IBMTrack_FixedDef) -> IBMTrack_FixedLayout:
+
+        # The layout depends only on these parameters. Some image handlers
+        # modify the config directly, so check them on every call.
+        key = (config.format_name, config.secs, tuple(config.sz),
+               config.rate, config.rpm, config.iam, config.interleave,
+               config.gap1, config.gap2, config.gap3, config.gap4a)
+        if config._layout is not None and config._layout[0] == key:
+            return config._layout[1]
 
         def sec_n(i):
             return config.sz[i] if i < len(config.sz) else config.sz[-1]
@@ -685,12 +785,8 @@ class IBMTrack_Fixed(IBMTrack):
             mode, gaps, mark_dam = Mode.FM, FMGaps, Mark.DAM
             synclen = 1 # Mark
 
-        t = cls(cyl, head, mode)
+        gap_presync = 12 if mode is Mode.MFM else 6
         nsec = config.secs
-        t.img_bps = config.img_bps
-
-        if config.gapbyte is not None:
-            t.gapbyte = config.gapbyte
 
         if config.iam:
             gap1 = gaps.gap1 if config.gap1 is None else config.gap1
@@ -702,9 +798,9 @@ class IBMTrack_Fixed(IBMTrack):
 
         idx_sz = gap4a
         if gap1 is not None:
-            idx_sz += t.gap_presync + synclen + gap1
-        idam_sz = t.gap_presync + synclen + 4 + 2 + gap2
-        dam_sz_pre = t.gap_presync + synclen
+            idx_sz += gap_presync + synclen + gap1
+        idam_sz = gap_presync + synclen + 4 + 2 + gap2
+        dam_sz_pre = gap_presync + synclen
         dam_sz_post = 2 + gap3
 
         tracklen = idx_sz + (idam_sz + dam_sz_pre + dam_sz_post) * nsec
@@ -752,27 +848,69 @@ class IBMTrack_Fixed(IBMTrack):
             tracklen -= gap4a - new_gap4a
             gap4a = new_gap4a
 
-        if tracklen > tracklen_bc * 105//100:
+        layout = IBMTrack_FixedLayout()
+        layout.mode, layout.mark_dam, layout.synclen = mode, mark_dam, synclen
+        layout.gap1, layout.gap2, layout.gap3 = gap1, gap2, gap3
+        layout.gap4a = gap4a
+        layout.oversized = tracklen > tracklen_bc * 105//100
+        layout.overage = 100.0*tracklen/tracklen_bc
+        tracklen_bc = max(tracklen_bc, tracklen)
+
+        layout.time_per_rev = 60 / rpm
+        layout.clock = layout.time_per_rev / tracklen_bc
+
+        # Create logical sector map in rotational order, starting at
+        # position zero. Tracks rotate this map according to their skew.
+        sec_map, pos = [-1] * nsec, 0
+        if math.gcd(config.interleave, nsec) == 1:
+            # Stepping by the interleave visits every position exactly once.
+            for i in range(nsec):
+                sec_map[i * config.interleave % nsec] = i
+        else:
+            for i in range(nsec):
+                while sec_map[pos] != -1:
+                    pos = (pos + 1) % nsec
+                sec_map[pos] = i
+                pos = (pos + config.interleave) % nsec
+        layout.sec_map = sec_map
+
+        config._layout = (key, layout)
+        return layout
+
+    @classmethod
+    def from_config(cls, config: IBMTrack_FixedDef, cyl: int, head: int,
+                    warn_on_oversize = True):
+
+        def sec_n(i):
+            return config.sz[i] if i < len(config.sz) else config.sz[-1]
+
+        layout = cls.prepare_layout(config)
+        mode, mark_dam, synclen = layout.mode, layout.mark_dam, layout.synclen
+        gap1, gap2, gap3 = layout.gap1, layout.gap2, layout.gap3
+
+        t = cls(cyl, head, mode)
+        nsec = config.secs
+        t.img_bps = config.img_bps
+
+        if config.gapbyte is not None:
+            t.gapbyte = config.gapbyte
+
+        if layout.oversized:
             t.oversized = True
             if warn_on_oversize:
                 print('T%d.%d: IBM: WARNING: Track is %.2f%% too long'
-                      % (cyl, head, 100.0*tracklen/tracklen_bc))
-        tracklen_bc = max(tracklen_bc, tracklen)
+                      % (cyl, head, layout.overage))
 
-        t.time_per_rev = 60 / rpm
-        t.clock = t.time_per_rev / tracklen_bc
+        t.time_per_rev = layout.time_per_rev
+        t.clock = layout.clock
 
-        # Create logical sector map in rotational order
-        sec_map, pos = [-1] * nsec, 0
+        # Rotate the logical sector map by the track skew
+        sec_map = layout.sec_map
         if nsec != 0:
             pos = (cyl*config.cskew + head*config.hskew) % nsec
-        for i in range(nsec):
-            while sec_map[pos] != -1:
-                pos = (pos + 1) % nsec
-            sec_map[pos] = i
-            pos = (pos + config.interleave) % nsec
+            sec_map = sec_map[-pos:] + sec_map[:-pos]
 
-        pos = gap4a
+        pos = layout.gap4a
         if gap1 is not None:
             pos += t.gap_presync
             t.iams = [IAM(pos*16,(pos+synclen)*16)]
@@ -796,6 +934,22 @@ class IBMTrack_Fixed(IBMTrack):
         return t
 
 
+class IBMTrack_FixedLayout:
+    # Track layout shared by all tracks of an IBMTrack_FixedDef
+    mode: Mode
+    mark_dam: int
+    synclen: int
+    gap1: Optional[int]
+    gap2: int
+    gap3: int
+    gap4a: int
+    oversized: bool
+    overage: float
+    time_per_rev: float
+    clock: float
+    sec_map: List[int]
+
+
 class IBMTrack_FixedDef(codec.TrackDef):
 
     default_revs = default_revs
@@ -818,6 +972,7 @@ class IBMTrack_FixedDef(codec.TrackDef):
         self.rate = 0
         self.img_bps: Optional[int] = None
         self.finalised = False
+        self._layout: Optional[Tuple[Tuple, IBMTrack_FixedLayout]] = None
 
     def add_param(self, key: str, val: str) -> None:
         if key == 'secs':
@@ -827,7 +982,7 @@ class IBMTrack_FixedDef(codec.TrackDef):
         elif key == 'bps':
             self.sz = []
             for x in val.split(','):
-                y = re.match(r'(\d+)\*(\d+)', x)
+                y = _RE_BPS.match(x)
                 if y is not None:
                     n, l = int(y.group(1)), int(y.group(2))
                 else:
@@ -218,7 +218,7 @@ class EDSK(Image):
         t += ibm.encode(bytes(track.gap_presync))
         t += ibm.mfm_sync_bytes
         am = bytes([0xa1, 0xa1, 0xa1, ibm.Mark.IDAM, c, h, r, n])
-        crc = ibm.crc16.new(am).crcValue
+        crc = binascii.crc_hqx(am, 0xffff)
         am += struct.pack('>H', crc)
         t += ibm.encode(am[3:])
         t += ibm.encode(bytes([track.gapbyte] * track.gap_2))
@@ -241,7 +241,7 @@ class EDSK(Image):
             if r != id or n != 2:
                 return None
         def addcrc(t,n):
-            crc = ibm.crc16.new(ibm.decode(t[-n*2:])).crcValue
+            crc = binascii.crc_hqx(ibm.decode(t[-n*2:]), 0xffff)
             t += ibm.encode(struct.pack('>H', crc))
         track = EDSKTrack()
         t = track.bytes
@@ -357,7 +357,7 @@ class EDSK(Image):
                         t += ibm.mfm_sync_bytes
                         am = bytes([0xa1, 0xa1, 0xa1, ibm.Mark.IDAM,
                                     c, h, r, n])
-                        crc = ibm.crc16.new(am).crcValue
+                        crc = binascii.crc_hqx(am, 0xffff)
                         if errs.id_crc_error:
                             crc ^= 0x5555
                         am += struct.pack('>H', crc)
@@ -418,7 +418,7 @@ class EDSK(Image):
                         t += ibm.encode(sec_data)
                         continue
                     am = bytes([0xa1, 0xa1, 0xa1, dmark]) + sec_data
-                    crc = ibm.crc16.new(am).crcValue
+                    crc = binascii.crc_hqx(am, 0xffff)
                     if errs.data_crc_error:
                         crc ^= 0x5555
                     am += struct.pack('>H', crc)
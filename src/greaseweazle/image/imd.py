@@ -176,7 +176,8 @@ class IMD(Image):
                 if not isinstance(s, ibm.Sector):
                     continue
                 rec = 0
-                if s.dam.data.count(s.dam.data[0]) == secsz:
+                data = bytes(s.dam.data)
+                if data.count(data[0]) == secsz:
                     rec |= 1
                 if s.dam.mark == ibm.Mark.DDAM:
                     rec |= 2
@@ -184,9 +185,9 @@ class IMD(Image):
                     rec |= 4
                 tdat += bytes([rec+1])
                 if rec & 1:
-                    tdat += s.dam.data[:1]
+                    tdat += data[:1]
                 else:
-                    tdat += s.dam.data[:]
+                    tdat += data
 
         return tdat
 
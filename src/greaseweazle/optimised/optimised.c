@@ -396,6 +396,60 @@ fail:
     return out;
 }
 
+/* Gather alternate bits of a byte into a nibble, starting at bit 7 (even
+ * bitcells) or bit 6 (odd bitcells). */
+static uint8_t even_nibble[256], odd_nibble[256];
+
+static void init_bitcell_tables(void)
+{
+    int x, i;
+    for (x = 0; x < 256; x++) {
+        for (i = 0; i < 4; i++) {
+            even_nibble[x] |= ((x >> (7-2*i)) & 1) << (3-i);
+            odd_nibble[x] |= ((x >> (6-2*i)) & 1) << (3-i);
+        }
+    }
+}
+
+static PyObject *
+py_split_bitcells(PyObject *self, PyObject *args)
+{
+    Py_buffer in;
+    PyObject *even = NULL, *odd = NULL, *res = NULL;
+    const uint8_t *p;
+    uint8_t *e, *o;
+    Py_ssize_t i, out_len;
+
+    if (!PyArg_ParseTuple(args, "y*", &in))
+        return NULL;
+
+    out_len = (in.len + 1) / 2;
+    even = PyBytes_FromStringAndSize(NULL, out_len);
+    odd = PyBytes_FromStringAndSize(NULL, out_len);
+    if ((even == NULL) || (odd == NULL))
+        goto fail;
+
+    p = (const uint8_t *)in.buf;
+    e = (uint8_t *)PyBytes_AsString(even);
+    o = (uint8_t *)PyBytes_AsString(odd);
+    for (i = 0; i < in.len / 2; i++) {
+        e[i] = (even_nibble[p[2*i]] << 4) | even_nibble[p[2*i+1]];
+        o[i] = (odd_nibble[p[2*i]] << 4) | odd_nibble[p[2*i+1]];
+    }
+    if (in.len & 1) {
+        e[i] = even_nibble[p[2*i]] << 4;
+        o[i] = odd_nibble[p[2*i]] << 4;
+    }
+
+    res = Py_BuildValue("OO", even, odd);
+
+fail:
+    Py_XDECREF(even);
+    Py_XDECREF(odd);
+    PyBuffer_Release(&in);
+    return res;
+}
+
 uint8_t *td0_unpack(uint8_t *packeddata, unsigned int size,
                     unsigned int *unpacked_size);
 
@@ -432,6 +486,7 @@ static PyMethodDef modulefuncs[] = {
     { "decode_c64_gcr", py_decode_c64_gcr, METH_VARARGS, NULL },
     { "encode_c64_gcr", py_encode_c64_gcr, METH_VARARGS, NULL },
     { "td0_unpack", py_td0_unpack, METH_VARARGS, NULL },
+    { "split_bitcells", py_split_bitcells, METH_VARARGS, NULL },
     { NULL }
 };
 
@@ -442,6 +497,7 @@ static PyModuleDef moduledef = {
 PyMODINIT_FUNC PyInit_optimised(void)
 {
     append_s = Py_BuildValue("s", "append");
+    init_bitcell_tables();
     return PyModule_Create(&moduledef);
 }
 
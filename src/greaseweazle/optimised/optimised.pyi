@@ -35,6 +35,9 @@ def encode_c64_gcr(dat: bytes) -> bytes:
 def td0_unpack(dat: bytes) -> bytes:
     ...
 
+def split_bitcells(dat: bytes) -> Tuple[bytes, bytes]:
+    ...
+
 # Local variables:
 # python-indent: 4
 # End: